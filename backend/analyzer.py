@@ -2,7 +2,10 @@
 Deviation Analyzer - Compares games against repertoire
 """
 import chess
-from dataclasses import dataclass
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from typing import Optional
 from datetime import datetime
 
@@ -10,48 +13,100 @@ from repertoire import Repertoire
 from repertoire_walker import RepertoireWalker
 
 
-@dataclass
-class DeviationResult:
-    """Result of analyzing a single game."""
-    game_url: str
-    opening_name: str
-    result_type: str  # "deviation", "opponent_left_book", or "book_completed"
-    move_number: int
-    user_color: str  # "white" or "black"
-    game_date: Optional[str] = None  # Game date (YYYY-MM-DD)
-    study_name: Optional[str] = None  # Study/chapter this came from
-    study_id: Optional[str] = None  # Lichess study ID
-    chapter_id: Optional[str] = None  # Lichess chapter ID
-    your_move: Optional[str] = None  # What you played (for deviations)
-    correct_move: Optional[str] = None  # What you should have played
-    opponent_move: Optional[str] = None  # What opponent played (when they left book)
-    fen: Optional[str] = None  # Position FEN for analysis link
-    variation_count: Optional[int] = None  # Number of variations available
-    
-    def to_dict(self) -> dict:
-        return {
-            "game_url": self.game_url,
-            "opening_name": self.opening_name,
-            "result_type": self.result_type,
-            "move_number": self.move_number,
-            "user_color": self.user_color,
-            "game_date": self.game_date,
-            "study_name": self.study_name,
-            "study_id": self.study_id,
-            "study_url": f"https://lichess.org/study/{self.study_id}" if self.study_id else None,
-            "chapter_id": self.chapter_id,
-            "chapter_url": (
-                f"https://lichess.org/study/{self.study_id}/{self.chapter_id}"
-                if self.study_id and self.chapter_id
-                else None
-            ),
-            "your_move": self.your_move,
-            "correct_move": self.correct_move,
-            "opponent_move": self.opponent_move,
-            "fen": self.fen,
-            "variation_count": self.variation_count,
-            "analysis_url": f"https://lichess.org/analysis/{self.fen.replace(' ', '_')}" if self.fen else None,
-        }
+logger = logging.getLogger(__name__)
+
+# Batches below this size are analyzed inline; above it, analysis fans out
+# to worker processes (pool startup + repertoire pickling must pay for itself)
+_PARALLEL_MIN_GAMES = 200
+_ANALYZE_CHUNKSIZE = 32
+
+# Per-worker analyzer, built once by the pool initializer
+_worker_analyzer: Optional["DeviationAnalyzer"] = None
+
+
+def _init_worker(repertoire: Repertoire):
+    """Unpickle the repertoire once per worker process."""
+    global _worker_analyzer
+    _worker_analyzer = DeviationAnalyzer(repertoire)
+
+
+def _analyze_in_worker(game: dict, username: str) -> Optional[dict]:
+    """Analyze a single game in a pool worker."""
+    return _worker_analyzer.analyze_one(game, username)
+
+
+@lru_cache(maxsize=4096)
+def _format_game_date(ts: int) -> Optional[str]:
+    """
+    Format a Unix timestamp as YYYY-MM-DD.
+
+    Memoized: games from the same session share end timestamps, and the
+    strftime round-trip is disproportionately expensive per result.
+    """
+    try:
+        return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+    except (ValueError, TypeError, OSError):
+        return None
+
+
+_STUDY_URL_PREFIX = "https://lichess.org/study/"
+
+
+def _make_result(
+    game: dict,
+    deviation,
+    user_color_str: str,
+    game_date: Optional[str],
+    *,
+    result_type: str,
+    move_number: int,
+    opening_name: str,
+    correct_move: Optional[str],
+    variation_count: Optional[int],
+    your_move: Optional[str] = None,
+    opponent_move: Optional[str] = None,
+) -> dict:
+    """Assemble a result payload in a single dict allocation."""
+    info = deviation.position_info
+    study_id = info.study_id
+    chapter_id = info.chapter_id
+    fen = deviation.fen
+    return {
+        "game_url": game.get("url", ""),
+        "opening_name": opening_name,
+        "result_type": result_type,  # "deviation", "opponent_left_book", or "book_completed"
+        "move_number": move_number,
+        "user_color": user_color_str,
+        "game_date": game_date,  # YYYY-MM-DD
+        "study_name": info.study_name,
+        "study_id": study_id,
+        "study_url": f"{_STUDY_URL_PREFIX}{study_id}" if study_id else None,
+        "chapter_id": chapter_id,
+        "chapter_url": (
+            f"{_STUDY_URL_PREFIX}{study_id}/{chapter_id}"
+            if study_id and chapter_id
+            else None
+        ),
+        "your_move": your_move,  # What you played (for deviations)
+        "correct_move": correct_move,  # What you should have played
+        "opponent_move": opponent_move,  # What opponent played (when they left book)
+        "fen": fen,  # Position FEN; clients derive the analysis link from it
+        "variation_count": variation_count,
+    }
+
+
+def _format_correct_move(deviation) -> Optional[str]:
+    """Format the expected-move display for an out-of-book position."""
+    variation_count = deviation.position_info.variation_count
+
+    if variation_count == 1:
+        return deviation.expected_moves[0]
+    if variation_count > 1:
+        moves_display = ", ".join(deviation.expected_moves[:5])
+        if variation_count > 5:
+            moves_display += ", ..."
+        return moves_display
+    return None
 
 
 class DeviationAnalyzer:
@@ -60,7 +115,56 @@ class DeviationAnalyzer:
     def __init__(self, repertoire: Repertoire):
         self.repertoire = repertoire
         self.walker = RepertoireWalker(repertoire)
-    
+
+    def analyze_games(self, games: list[dict], username: str) -> list[dict]:
+        """
+        Analyze a batch of games and collect the deviation results.
+
+        Analysis is pure-Python and CPU-bound, and games are independent,
+        so large batches fan out across a process pool (sidestepping the
+        GIL). The repertoire is pickled once per worker via the pool
+        initializer rather than once per game.
+
+        Args:
+            games: Game dicts with 'moves', 'white', 'black', 'url' etc.
+            username: The user's Chess.com username
+
+        Returns:
+            List of result dicts for games that produced a result
+        """
+        if len(games) < _PARALLEL_MIN_GAMES:
+            results = [self.analyze_one(game, username) for game in games]
+        else:
+            with ProcessPoolExecutor(
+                initializer=_init_worker,
+                initargs=(self.repertoire,),
+            ) as executor:
+                results = list(executor.map(
+                    _analyze_in_worker,
+                    games,
+                    repeat(username),
+                    chunksize=_ANALYZE_CHUNKSIZE,
+                ))
+
+        return [result for result in results if result]
+
+    def analyze_one(self, game: dict, username: str) -> Optional[dict]:
+        """
+        Analyze a single game, normalizing the result to a plain dict.
+
+        Individual game failures are logged and swallowed so one bad game
+        can't abort a whole batch.
+        """
+        try:
+            result = self.analyze_game(game, username)
+        except Exception as e:
+            logger.warning(
+                f"Failed to analyze game {game.get('url', 'unknown')}: {e}"
+            )
+            return None
+
+        return result
+
     def analyze_game(self, game: dict, username: str) -> Optional[dict]:
         """
         Analyze a single game and find the first deviation or out-of-book position.
@@ -70,7 +174,7 @@ class DeviationAnalyzer:
             username: The user's Chess.com username to determine their color
         
         Returns:
-            DeviationResult dict if deviation found, None if game followed book entirely
+            Result dict if deviation found, None if game followed book entirely
             or if the game doesn't start with moves from our repertoire
         """
         moves = game.get("moves", [])
@@ -85,6 +189,7 @@ class DeviationAnalyzer:
             user_color = chess.WHITE
         else:
             user_color = chess.BLACK
+        user_color_str = "white" if user_color == chess.WHITE else "black"
         
         # Use walker to find deviations
         deviation = self.walker.find_deviation(user_color, moves)
@@ -93,102 +198,57 @@ class DeviationAnalyzer:
             return None
         
         # Format game date from Unix timestamp
-        game_date = None
-        if game.get("date"):
-            try:
-                game_date = datetime.fromtimestamp(game.get("date")).strftime("%Y-%m-%d")
-            except (ValueError, TypeError, OSError):
-                game_date = None
+        game_date = _format_game_date(game["date"]) if game.get("date") else None
         
         game_opening_name = game.get("opening_name") or None
         
         # Build result based on deviation type
         if deviation.deviation_type == "deviation":
-            # User played a move not in repertoire
-            variation_count = deviation.position_info.variation_count
-            
-            # Format correct move display
-            if variation_count == 1:
-                correct_move = deviation.expected_moves[0]
-            elif variation_count > 1:
-                moves_display = ", ".join(deviation.expected_moves[:5])
-                if variation_count > 5:
-                    moves_display += ", ..."
-                correct_move = moves_display
-            else:
-                correct_move = None
-            
             # Skip move 1 deviations - that's "not this opening", not a deviation
             if deviation.move_number == 1:
                 return None
-            
-            return DeviationResult(
-                game_url=game.get("url", ""),
-                opening_name=deviation.position_info.opening_name or game_opening_name or "Unknown",
+
+            return _make_result(
+                game,
+                deviation,
+                user_color_str,
+                game_date,
                 result_type="deviation",
                 move_number=deviation.move_number,
-                user_color="white" if user_color == chess.WHITE else "black",
-                game_date=game_date,
-                study_name=deviation.position_info.study_name,
-                study_id=deviation.position_info.study_id,
-                chapter_id=deviation.position_info.chapter_id,
+                opening_name=deviation.position_info.opening_name or game_opening_name or "Unknown",
                 your_move=deviation.actual_move,
-                correct_move=correct_move,
-                fen=deviation.fen,
-                variation_count=variation_count,
-            ).to_dict()
-        
+                correct_move=_format_correct_move(deviation),
+                variation_count=deviation.position_info.variation_count,
+            )
+
         elif deviation.deviation_type == "opponent_left_book":
             # Opponent played a move not in repertoire
             if deviation.move_number == 1:
                 # Different opening family, skip
                 return None
-            
-            variation_count = deviation.position_info.variation_count
-            
-            # Format correct move display
-            if variation_count == 1:
-                correct_move = deviation.expected_moves[0]
-            elif variation_count > 1:
-                moves_display = ", ".join(deviation.expected_moves[:5])
-                if variation_count > 5:
-                    moves_display += ", ..."
-                correct_move = moves_display
-            else:
-                correct_move = None
-            
-            return DeviationResult(
-                game_url=game.get("url", ""),
-                opening_name=(
-                    game_opening_name
-                    if deviation.move_number == 1 and game_opening_name
-                    else (deviation.position_info.opening_name or game_opening_name or "Unknown")
-                ),
+
+            return _make_result(
+                game,
+                deviation,
+                user_color_str,
+                game_date,
                 result_type="opponent_left_book",
                 move_number=deviation.move_number,
-                user_color="white" if user_color == chess.WHITE else "black",
-                game_date=game_date,
-                study_name=deviation.position_info.study_name,
-                study_id=deviation.position_info.study_id,
-                chapter_id=deviation.position_info.chapter_id,
+                opening_name=deviation.position_info.opening_name or game_opening_name or "Unknown",
                 opponent_move=deviation.actual_move,
-                correct_move=correct_move,
-                variation_count=variation_count,
-                fen=deviation.fen,
-            ).to_dict()
-        
+                correct_move=_format_correct_move(deviation),
+                variation_count=deviation.position_info.variation_count,
+            )
+
         else:  # book_completed
-            return DeviationResult(
-                game_url=game.get("url", ""),
-                opening_name=deviation.position_info.opening_name or game_opening_name or "Unknown",
+            return _make_result(
+                game,
+                deviation,
+                user_color_str,
+                game_date,
                 result_type="book_completed",
                 move_number=max(1, deviation.move_number),
-                user_color="white" if user_color == chess.WHITE else "black",
-                game_date=game_date,
-                study_name=deviation.position_info.study_name,
-                study_id=deviation.position_info.study_id,
-                chapter_id=deviation.position_info.chapter_id,
+                opening_name=deviation.position_info.opening_name or game_opening_name or "Unknown",
                 correct_move="All book moves correct",
-                fen=deviation.fen,
                 variation_count=0,
-            ).to_dict()
+            )
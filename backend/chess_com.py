@@ -1,23 +1,187 @@
 """
 Chess.com API Client
 """
+import asyncio
 import httpx
+import logging
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 import io
+import random
 import re
+import sys
 import chess.pgn
 from opening_normalizer import OpeningNormalizer
 
 
+logger = logging.getLogger(__name__)
+
+
+# Fast-path PGN scanning. Chess.com movetext already contains SAN, so we can
+# scrub comments/variations and read the tokens directly instead of replaying
+# the game through python-chess (which regenerates SAN via legal-move
+# generation for every ply).
+_HEADER_RE = re.compile(r'^\[(\w+)\s+"(.*)"\]', re.MULTILINE)
+_COMMENT_RE = re.compile(r"\{[^}]*\}")
+_LINE_COMMENT_RE = re.compile(r";[^\n]*")
+_VARIATION_RE = re.compile(r"\([^()]*\)")
+_SAN_RE = re.compile(
+    r"(?:O-O-O|O-O|[KQRBN][a-h]?[1-8]?x?[a-h][1-8](?:=[QRBN])?"
+    r"|[a-h](?:x[a-h])?[1-8](?:=[QRBN])?)[+#]?"
+)
+# Everything a clean Chess.com movetext may contain besides SAN: move
+# numbers ("3." / "3..."), game results, NAGs, and the unknown-result star.
+# Any other leftover token means the scan may have dropped something.
+_IGNORABLE_TOKEN_RE = re.compile(r"(?:\d+\.(?:\.\.)?|1-0|0-1|1/2-1/2|\*|\$\d+)\Z")
+
+
+def _parse_pgn(pgn_str: str) -> dict:
+    """
+    Parse a PGN string to extract moves and headers.
+
+    Tries the cheap regex scan first; only falls back to the full
+    python-chess parser when the movetext can't be scanned cleanly.
+    This avoids a full board reconstruction per game on the sync hot path.
+    """
+    if not pgn_str:
+        return {"moves": [], "headers": {}}
+
+    parsed = _fast_parse_pgn(pgn_str)
+    if parsed is not None:
+        return parsed
+
+    return _full_parse_pgn(pgn_str)
+
+
+def _parse_pgn_batch(pgn_strs: list[str]) -> list[dict]:
+    """Parse a batch of PGN strings in one call (amortizes per-call setup)."""
+    return [_parse_pgn(pgn_str) for pgn_str in pgn_strs]
+
+
+# Months below this size are parsed in a worker thread; larger ones fan out
+# across worker processes, since the GIL serializes the regex work in threads
+_PARSE_POOL_MIN_GAMES = 200
+_PARSE_CHUNK_SIZE = 64
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Lazily create the shared PGN-parsing process pool."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor()
+    return _parse_pool
+
+
+async def _parse_pgns(pgn_strs: list[str]) -> list[dict]:
+    """
+    Parse PGNs off the event loop.
+
+    Small batches go to a single worker thread; large ones are chunked
+    across the process pool so multiple cores parse in parallel.
+    """
+    if len(pgn_strs) < _PARSE_POOL_MIN_GAMES:
+        return await asyncio.to_thread(_parse_pgn_batch, pgn_strs)
+
+    loop = asyncio.get_running_loop()
+    chunks = [
+        pgn_strs[i:i + _PARSE_CHUNK_SIZE]
+        for i in range(0, len(pgn_strs), _PARSE_CHUNK_SIZE)
+    ]
+    parsed_chunks = await asyncio.gather(*(
+        loop.run_in_executor(_get_parse_pool(), _parse_pgn_batch, chunk)
+        for chunk in chunks
+    ))
+    return [parsed for chunk in parsed_chunks for parsed in chunk]
+
+
+def _fast_parse_pgn(pgn_str: str) -> Optional[dict]:
+    """
+    Extract SAN moves and headers with regexes, without building a board.
+
+    Returns None if the PGN doesn't look scannable (e.g. a header
+    section without a movetext separator, or unbalanced variation
+    parentheses), signaling the caller to fall back to
+    chess.pgn.read_game.
+    """
+    if pgn_str.lstrip().startswith("["):
+        header_part, sep, movetext = pgn_str.partition("\n\n")
+        if not sep:
+            return None
+        headers = dict(_HEADER_RE.findall(header_part))
+    else:
+        # Bare movetext without a header section
+        headers = {}
+        movetext = pgn_str
+
+    # Strip comments first (they may contain parentheses), then
+    # variations inside-out to handle nesting.
+    movetext = _COMMENT_RE.sub(" ", movetext)
+    movetext = _LINE_COMMENT_RE.sub(" ", movetext)
+    while "(" in movetext:
+        movetext, replaced = _VARIATION_RE.subn(" ", movetext)
+        if not replaced:
+            return None
+
+    # Consistency check: after removing the SAN tokens, only move numbers,
+    # results, and NAGs should remain. Anything else (annotation suffixes,
+    # null moves, exotic notation) goes to the full parser instead of being
+    # silently dropped.
+    ignorable = _IGNORABLE_TOKEN_RE.match
+    for token in _SAN_RE.sub(" ", movetext).split():
+        if not ignorable(token):
+            return None
+
+    # Interned SANs share objects with the repertoire tree keys, so the
+    # analyzer's dict probes compare by pointer before falling back to hash
+    moves = [sys.intern(san) for san in _SAN_RE.findall(movetext)]
+    return {"moves": moves, "headers": headers}
+
+
+def _full_parse_pgn(pgn_str: str) -> dict:
+    """Parse PGN via python-chess, re-deriving SAN from the game tree."""
+    try:
+        game = chess.pgn.read_game(io.StringIO(pgn_str))
+        if not game:
+            return {"moves": [], "headers": {}}
+
+        # Extract moves in SAN format
+        moves = []
+        board = game.board()
+        for move in game.mainline_moves():
+            moves.append(sys.intern(board.san(move)))
+            board.push(move)
+
+        # Extract headers
+        headers = dict(game.headers)
+
+        return {"moves": moves, "headers": headers}
+    except Exception:
+        return {"moves": [], "headers": {}}
+
+
 class ChessComClient:
     """Client for Chess.com Public API."""
     
     BASE_URL = "https://api.chess.com/pub"
+
+    # Concurrent month fetches allowed per client
+    MAX_CONCURRENT_FETCHES = 6
+
+    # Retry policy for transient failures (429/5xx/transport errors):
+    # jittered exponential backoff so a blip doesn't sink a whole backfill
+    MAX_FETCH_ATTEMPTS = 4
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 8.0
     
     def __init__(self):
         self._client: Optional[httpx.AsyncClient] = None
     
     async def __aenter__(self):
+        # HTTP/2 lets the concurrent month fetches multiplex over one TLS
+        # connection instead of opening a socket per request
         self._client = httpx.AsyncClient(
             base_url=self.BASE_URL,
             headers={
@@ -25,6 +189,8 @@ class ChessComClient:
                 "User-Agent": "ChessOpeningAnalyzer/1.0 (github.com/chess-opening-analyzer)",
             },
             timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
         )
         return self
     
@@ -36,42 +202,128 @@ class ChessComClient:
         """Get list of available monthly game archives."""
         response = await self._client.get(f"/player/{username}/games/archives")
         response.raise_for_status()
-        return response.json().get("archives", [])
+        return orjson.loads(response.content).get("archives", [])
     
+    async def get_games_for_months(
+        self,
+        username: str,
+        months: list[tuple[int, int]],
+        skip_urls_by_month: Optional[dict[tuple[int, int], set[str]]] = None,
+    ) -> dict[tuple[int, int], list[dict]]:
+        """
+        Fetch several months of games concurrently.
+
+        Each month is an independent HTTP round-trip, so they are gathered
+        behind a bounded semaphore (politeness to the Chess.com API) and
+        multiplexed over the HTTP/2 connection. Months without an archive
+        (404) or that fail outright come back empty; failures are logged
+        so one bad month never sinks the batch.
+
+        Args:
+            username: Chess.com username
+            months: (year, month) tuples to fetch
+            skip_urls_by_month: Optional per-month URL sets to skip
+
+        Returns:
+            Dict mapping (year, month) -> list of game dicts
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_FETCHES)
+
+        async def fetch_one(year: int, month: int) -> list[dict]:
+            skip_urls = (
+                skip_urls_by_month.get((year, month))
+                if skip_urls_by_month
+                else None
+            )
+            async with semaphore:
+                error: Optional[Exception] = None
+                for attempt in range(1, self.MAX_FETCH_ATTEMPTS + 1):
+                    try:
+                        return await self.get_all_games_for_month(
+                            username, year, month, skip_urls=skip_urls
+                        )
+                    except httpx.HTTPStatusError as e:
+                        status = e.response.status_code
+                        if status == 404:
+                            # No archive for this month
+                            return []
+                        if status != 429 and status < 500:
+                            # Other 4xx won't get better on retry
+                            logger.warning(f"Error fetching {year}/{month} for {username}: {e}")
+                            return []
+                        error = e
+                    except httpx.HTTPError as e:
+                        # Transport-level blip; worth retrying
+                        error = e
+                    except Exception as e:
+                        logger.warning(f"Error fetching {year}/{month} for {username}: {e}")
+                        return []
+
+                    if attempt < self.MAX_FETCH_ATTEMPTS:
+                        # Exponential backoff with jitter to avoid retrying
+                        # all failed months in lockstep
+                        delay = min(
+                            self.RETRY_MAX_DELAY,
+                            self.RETRY_BASE_DELAY * 2 ** (attempt - 1),
+                        )
+                        await asyncio.sleep(delay * (0.5 + random.random()))
+
+                logger.warning(
+                    f"Error fetching {year}/{month} for {username} "
+                    f"after {self.MAX_FETCH_ATTEMPTS} attempts: {error}"
+                )
+                return []
+
+        results = await asyncio.gather(
+            *(fetch_one(year, month) for year, month in months)
+        )
+        return dict(zip(months, results))
+
     async def get_all_games_for_month(
         self,
         username: str,
         year: int,
         month: int,
+        skip_urls: Optional[set[str]] = None,
     ) -> list[dict]:
         """
         Fetch ALL games for a specific month without any filters.
         Used for caching - returns raw game data.
-        
+
         Args:
             username: Chess.com username
             year: Year (e.g., 2026)
             month: Month (1-12)
-        
+            skip_urls: Game URLs to drop before parsing (already cached)
+
         Returns:
             List of game dicts with all fields
         """
         month_str = str(month).zfill(2)
         response = await self._client.get(f"/player/{username}/games/{year}/{month_str}")
         response.raise_for_status()
-        
-        raw_games = response.json().get("games", [])
+
+        # orjson decodes the multi-MB monthly blobs (PGNs embedded) several
+        # times faster than stdlib json, straight from the response bytes
+        raw_games = orjson.loads(response.content).get("games", [])
+
+        # Incremental refresh: games we already cached don't need their
+        # PGN re-parsed (the current month is re-fetched on every sync)
+        if skip_urls:
+            raw_games = [g for g in raw_games if g.get("url", "") not in skip_urls]
+
         games = []
-        
-        for game in raw_games:
+
+        # Batch-parse the month's PGNs off the event loop (process pool for
+        # big months), so concurrent month fetches keep their I/O moving
+        parsed_games = await _parse_pgns([game.get("pgn", "") for game in raw_games])
+
+        for game, parsed_game in zip(raw_games, parsed_games):
             # Extract opening name from eco URL
             eco_url = game.get("eco", "")
             opening_name = OpeningNormalizer.from_eco_url(eco_url)
-            
-            # Parse PGN to extract moves
+
             pgn_str = game.get("pgn", "")
-            parsed_game = self._parse_pgn(pgn_str)
-            
             games.append({
                 "url": game.get("url", ""),
                 "date": game.get("end_time"),  # Unix timestamp
@@ -92,26 +344,3 @@ class ChessComClient:
         
         return games
 
-    def _parse_pgn(self, pgn_str: str) -> dict:
-        """Parse PGN string to extract moves and headers."""
-        if not pgn_str:
-            return {"moves": [], "headers": {}}
-        
-        try:
-            game = chess.pgn.read_game(io.StringIO(pgn_str))
-            if not game:
-                return {"moves": [], "headers": {}}
-            
-            # Extract moves in SAN format
-            moves = []
-            board = game.board()
-            for move in game.mainline_moves():
-                moves.append(board.san(move))
-                board.push(move)
-            
-            # Extract headers
-            headers = dict(game.headers)
-            
-            return {"moves": moves, "headers": headers}
-        except Exception:
-            return {"moves": [], "headers": {}}
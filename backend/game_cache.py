@@ -3,12 +3,28 @@ Game Cache - SQLite storage for Chess.com games
 """
 import sqlite3
 import json
+import sys
 import time
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
 
 
+def _peek_first_move(moves_json: Optional[str]) -> Optional[str]:
+    """
+    Cheaply peek the first SAN move out of a stored JSON array string.
+
+    SAN tokens never need JSON escaping, so the first element of
+    '["e4", "e5", ...]' can be sliced out without running json.loads.
+    """
+    if not moves_json or not moves_json.startswith('["'):
+        return None
+    end = moves_json.find('"', 2)
+    if end < 0:
+        return None
+    return moves_json[2:end]
+
+
 class GameCache:
     """SQLite-based cache for Chess.com games."""
     
@@ -75,11 +91,17 @@ class GameCache:
         to_month: Optional[int] = None,
         from_ts: Optional[int] = None,
         to_ts: Optional[int] = None,
+        first_move_whitelist: Optional[set[str]] = None,
     ) -> list[dict]:
         """
         Get cached games for a user with optional filters.
-        
+
         All filtering is done in Python for flexibility.
+
+        If first_move_whitelist is given, games whose first move is not in
+        the set are skipped before their move list is JSON-decoded. The
+        analyzer rejects such games anyway (first move not in repertoire),
+        so this avoids decoding move lists that would be thrown away.
         """
         username_lower = username.lower()
         
@@ -93,28 +115,30 @@ class GameCache:
         
         games = []
         for row in rows:
-            game = dict(row)
-            # Parse JSON fields
-            game["moves"] = json.loads(game["moves"]) if game["moves"] else []
-            game["headers"] = json.loads(game["headers"]) if game["headers"] else {}
-            game["rated"] = bool(game["rated"])
-            
-            # Apply filters
-            if time_classes and game["time_class"] not in time_classes:
+            # Apply every cheap column filter on the raw row first, so
+            # rejected games never pay for the dict build or JSON decode
+
+            # Skip games outside the repertoire before decoding their moves
+            if first_move_whitelist is not None:
+                first_move = _peek_first_move(row["moves"])
+                if first_move is None or first_move not in first_move_whitelist:
+                    continue
+
+            if time_classes and row["time_class"] not in time_classes:
                 continue
-            if rated is not None and game["rated"] != rated:
+            if rated is not None and bool(row["rated"]) != rated:
                 continue
-            
+
             # Color filter
             if color:
-                is_white = game["white"].lower() == username_lower
+                is_white = row["white"].lower() == username_lower
                 if color == "white" and not is_white:
                     continue
                 if color == "black" and is_white:
                     continue
-            
+
             # Date range filter
-            game_ts = game.get("date")
+            game_ts = row["date"]
             if from_ts is not None or to_ts is not None:
                 if game_ts is None:
                     continue
@@ -124,16 +148,24 @@ class GameCache:
                     continue
 
             if from_year and from_month:
-                game_date = (game["year"], game["month"])
-                if game_date < (from_year, from_month):
+                if (row["year"], row["month"]) < (from_year, from_month):
                     continue
             if to_year and to_month:
-                game_date = (game["year"], game["month"])
-                if game_date > (to_year, to_month):
+                if (row["year"], row["month"]) > (to_year, to_month):
                     continue
-            
+
+            # Kept: build the dict and decode the JSON fields. SANs are
+            # interned so the analyzer's tree probes compare against the
+            # (also interned) repertoire keys by pointer instead of hashing.
+            game = dict(row)
+            game["moves"] = (
+                [sys.intern(san) for san in json.loads(game["moves"])]
+                if game["moves"] else []
+            )
+            game["headers"] = json.loads(game["headers"]) if game["headers"] else {}
+            game["rated"] = bool(game["rated"])
             games.append(game)
-        
+
         return games
     
     def save_games(self, username: str, games: list[dict], year: int, month: int):
@@ -198,6 +230,17 @@ class GameCache:
             """, (username_lower, now, year, month))
             conn.commit()
     
+    def get_cached_urls(self, username: str, year: int, month: int) -> set[str]:
+        """Get the URLs of games already cached for a specific month."""
+        username_lower = username.lower()
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "SELECT url FROM games WHERE username = ? AND year = ? AND month = ?",
+                (username_lower, year, month)
+            )
+            return {row[0] for row in cursor.fetchall()}
+
     def get_cached_months(self, username: str) -> set[tuple[int, int]]:
         """Get set of (year, month) tuples that have cached games."""
         username_lower = username.lower()
@@ -2,9 +2,17 @@
 Opening Name Normalizer - Centralized rules for cleaning and standardizing opening names.
 """
 import re
+from functools import lru_cache
 from typing import Optional
 
 
+# Trailing move-number suffix, e.g. "Italian Game-4.exd5" -> "Italian Game".
+# Compiled once at import; normalize() runs per game during archive sync.
+_MOVE_SUFFIX_RE = re.compile(r"\s*-?\d+\..*$")
+
+_DIGITS = frozenset("0123456789")
+
+
 class OpeningNormalizer:
     """
     Normalizes opening names from various sources into a canonical format.
@@ -16,10 +24,14 @@ class OpeningNormalizer:
     """
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def normalize(name: str) -> str:
         """
         Normalize an opening name to canonical form.
-        
+
+        Memoized: the same study, chapter, and opening names come through
+        repeatedly (every chapter of a study, every game of an opening).
+
         Applies all normalization rules in order:
         1. Remove redundant prefix before colon
         2. Replace hyphens with spaces
@@ -45,7 +57,10 @@ class OpeningNormalizer:
 
         # Rule 3: Remove move numbers at the end
         # E.g., "Italian Game-4.exd5" -> "Italian Game"
-        name = re.sub(r"\s*-?\d+\..*$", "", name)
+        # Most names carry no digits at all, so a C-level scan skips the
+        # regex engine entirely for the common case
+        if not _DIGITS.isdisjoint(name):
+            name = _MOVE_SUFFIX_RE.sub("", name)
 
         # Rule 4: Clean up excessive whitespace
         name = " ".join(name.split())
@@ -74,15 +89,20 @@ class OpeningNormalizer:
         Returns:
             Name with prefix removed (or original if no colon)
         """
-        if ":" in name:
-            parts = name.split(":", 1)
-            return parts[1].strip()
+        # partition scans the string once, vs the `in` check + split pair
+        _, sep, suffix = name.partition(":")
+        if sep:
+            return suffix.strip()
         return name
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def from_eco_url(eco_url: str) -> str:
         """
         Extract and normalize opening name from Chess.com ECO URL.
+
+        Memoized: months of games share a small set of ECO URLs, so the
+        slug extraction and normalization run once per distinct URL.
         
         Example:
             Input: "https://www.chess.com/openings/Italian-Game-Two-Knights-Defense"
@@ -97,12 +117,12 @@ class OpeningNormalizer:
         if not eco_url:
             return ""
 
-        # Extract the last part of the URL path
-        match = re.search(r"/openings/([^/]+)$", eco_url)
-        if not match:
+        # Extract the last part of the URL path. The URL shape is fixed, so
+        # plain string ops beat running the regex engine per game.
+        _, sep, opening_slug = eco_url.rpartition("/openings/")
+        if not sep or not opening_slug or "/" in opening_slug:
             return ""
 
-        opening_slug = match.group(1)
         # Normalize the slug
         return OpeningNormalizer.normalize(opening_slug)
 
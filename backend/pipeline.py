@@ -3,6 +3,7 @@ Repertoire Analysis Pipeline - Orchestrates the full analysis workflow.
 Abstracts fetching repertoire and games from the orchestration logic.
 """
 
+import asyncio
 import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
@@ -10,13 +11,13 @@ from typing import Optional
 import logging
 
 from repertoire import Repertoire
-from analyzer import DeviationAnalyzer, DeviationResult
+from analyzer import DeviationAnalyzer
 
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class GameFilters:
     """Game filtering parameters."""
     time_classes: Optional[list[str]] = None
@@ -30,7 +31,7 @@ class GameFilters:
     to_ts: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisReport:
     """Result of analyzing all games against repertoire."""
     deviations: list[dict] = field(default_factory=list)
@@ -68,14 +69,17 @@ class GameSource(ABC):
         self,
         username: str,
         filters: GameFilters,
+        first_move_whitelist: Optional[set[str]] = None,
     ) -> list[dict]:
         """
         Fetch games matching filters.
-        
+
         Args:
             username: Chess.com username
             filters: Game filtering parameters
-        
+            first_move_whitelist: If given, skip games whose first move is
+                not in the set (they can't match the repertoire)
+
         Returns:
             List of game dicts with 'moves', 'white', 'black', 'url', etc.
         """
@@ -123,38 +127,19 @@ class RepertoireAnalysisPipeline:
         """
         # Step 1: Fetch or use cached repertoire
         repertoire = await self._get_repertoire(study_ids, study_names)
+
+        # Step 2: Fetch games. Only games starting with a repertoire move
+        # can produce deviations, so let the source drop the rest early.
+        first_moves = set(repertoire.tree.children)
+        games = await self.game_source.fetch_games(
+            username, filters, first_move_whitelist=first_moves
+        )
         
-        # Step 2: Fetch games
-        games = await self.game_source.fetch_games(username, filters)
-        
-        # Step 3: Analyze each game
+        # Step 3: Analyze the games. The analyzer fans large batches out
+        # to worker processes; run it off the event loop either way.
         analyzer = DeviationAnalyzer(repertoire)
-        deviations = []
-        
-        for game in games:
-            try:
-                result = analyzer.analyze_game(game, username)
-                if not result:
-                    continue
-
-                # Analyzer may return either a DeviationResult object
-                # (with a to_dict() method) or a plain dict. Handle both.
-                if hasattr(result, "to_dict") and callable(getattr(result, "to_dict")):
-                    deviations.append(result.to_dict())
-                elif isinstance(result, dict):
-                    deviations.append(result)
-                else:
-                    # Unknown result type; log and skip
-                    logger.warning(
-                        f"Analyzer returned unexpected result type for game {game.get('url', 'unknown')}: {type(result)}"
-                    )
-            except Exception as e:
-                # Log and continue on individual game analysis failures
-                logger.warning(
-                    f"Failed to analyze game {game.get('url', 'unknown')}: {e}"
-                )
-                continue
-        
+        deviations = await asyncio.to_thread(analyzer.analyze_games, games, username)
+
         # Step 4: Compile report
         report = AnalysisReport(
             deviations=deviations,
@@ -3,14 +3,16 @@ Repertoire Parser - Builds a move tree from Lichess study PGNs
 """
 import io
 import re
+import sys
 import chess
 import chess.pgn
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from typing import Optional
 from opening_normalizer import OpeningNormalizer
 
 
-@dataclass
+@dataclass(slots=True)
 class RepertoireNode:
     """A node in the repertoire tree."""
     # For opponent moves: multiple possible moves they can play
@@ -24,21 +26,170 @@ class RepertoireNode:
     study_id: Optional[str] = None
     # Lichess chapter ID this line came from
     chapter_id: Optional[str] = None
-    # Is this a position where it's your turn to move?
-    is_your_turn: bool = False
+    # The move leading into this node, parsed once at build time so later
+    # traversals never re-run SAN parsing (None for the root)
+    move: Optional[chess.Move] = None
 
 
-@dataclass
+# Fanout at which compiled children switch from pair tuple to dict. Most
+# repertoire nodes have 1-3 children, where an empty dict's ~232 bytes dwarf
+# a pair tuple and a short identity-first scan beats hashing.
+MIN_DICT_FANOUT = 8
+
+
+def lookup_child(children, move_san: str) -> Optional[int]:
+    """Look up a move in a compiled node's children (pair tuple or dict)."""
+    if type(children) is dict:
+        return children.get(move_san)
+    for san, child_id in children:
+        # SANs are interned on both sides, so identity usually decides
+        if san is move_san or san == move_san:
+            return child_id
+    return None
+
+
+def child_sans(children) -> list[str]:
+    """List the moves available from a compiled node's children."""
+    if type(children) is dict:
+        return list(children)
+    return [san for san, _ in children]
+
+
+@dataclass(slots=True)
+class CompiledTree:
+    """
+    Flat, array-based form of a repertoire tree for the analysis walk.
+
+    Nodes are integer ids indexing parallel arrays: the hot per-ply walk in
+    the analyzer then follows contiguous arrays instead of chasing
+    per-node dataclass attributes, and node metadata is shared by id.
+    The root is always id 0.
+    """
+    children: tuple  # node id -> (san, child id) pair tuple, or dict at high fanout
+    opening_names: tuple
+    study_names: tuple
+    study_ids: tuple
+    chapter_ids: tuple
+
+
+def compile_tree(root: RepertoireNode) -> CompiledTree:
+    """Flatten a RepertoireNode tree into a CompiledTree (level order)."""
+    nodes = [root]
+    children: list = []
+    opening_names: list[Optional[str]] = []
+    study_names: list[Optional[str]] = []
+    study_ids: list[Optional[str]] = []
+    chapter_ids: list[Optional[str]] = []
+
+    # `nodes` grows while we iterate, giving a breadth-first id assignment
+    for node in nodes:
+        mapping = {}
+        for san, child in node.children.items():
+            # Re-intern at freeze time: subtrees merged back from worker
+            # processes carry non-interned key copies
+            mapping[sys.intern(san)] = len(nodes)
+            nodes.append(child)
+        children.append(
+            mapping if len(mapping) >= MIN_DICT_FANOUT else tuple(mapping.items())
+        )
+        opening_names.append(node.opening_name)
+        study_names.append(node.study_name)
+        study_ids.append(node.study_id)
+        chapter_ids.append(node.chapter_id)
+
+    # Freeze the parallel arrays as tuples: the compiled form is immutable
+    # by contract, and tuples store their items inline in one allocation
+    # (no list over-allocation slack) for the traversal to index into
+    return CompiledTree(
+        children=tuple(children),
+        opening_names=tuple(opening_names),
+        study_names=tuple(study_names),
+        study_ids=tuple(study_ids),
+        chapter_ids=tuple(chapter_ids),
+    )
+
+
+@dataclass(slots=True)
 class Repertoire:
-    """Complete repertoire with separate trees for White and Black."""
-    white_tree: RepertoireNode = field(default_factory=RepertoireNode)
-    black_tree: RepertoireNode = field(default_factory=RepertoireNode)
-    # FEN position index: maps FEN string -> (opening_name, study_name, variation_count)
-    position_index: dict[str, tuple[str, str, int]] = field(default_factory=dict)
-    
+    """
+    Complete repertoire of book lines.
+
+    Both colors walk the same move tree - whose moves are "yours" is a pure
+    function of ply parity and color, so it is derived at query time
+    instead of being baked into duplicate White/Black trees.
+    """
+    tree: RepertoireNode = field(default_factory=RepertoireNode)
+    # Position index for transposition handling: maps a python-chess
+    # transposition key -> (opening_name, study_name, variation_count)
+    position_index: dict = field(default_factory=dict)
+    # Compiled flat form of the tree, built lazily once the tree is final
+    _compiled: Optional[CompiledTree] = field(default=None, init=False, repr=False)
+
     def get_tree(self, color: chess.Color) -> RepertoireNode:
-        """Get the repertoire tree for a specific color."""
-        return self.white_tree if color == chess.WHITE else self.black_tree
+        """Get the repertoire tree for a specific color (shared)."""
+        return self.tree
+
+    def get_compiled(self, color: chess.Color) -> CompiledTree:
+        """Get the compiled tree for a color, flattening on first use."""
+        if self._compiled is None:
+            self._compiled = compile_tree(self.tree)
+        return self._compiled
+
+
+# Repertoires with at least this many studies parse them across a process
+# pool; below it, pool startup costs more than the parallel parse saves
+_PARALLEL_MIN_STUDIES = 4
+
+
+def _parse_study_worker(study: "tuple[str, str, str, Optional[str]]") -> RepertoireNode:
+    """Parse a single study into a standalone tree (process-pool worker)."""
+    pgn, opening_name, study_name, study_id = study
+    builder = RepertoireBuilder()
+    builder.add_study(pgn, opening_name, study_name, study_id)
+    return builder.repertoire.tree
+
+
+def _merge_tree(dst: RepertoireNode, src: RepertoireNode):
+    """
+    Merge src's subtree into dst (iteratively, like the tree walks).
+
+    Matches the serial build's precedence: metadata already present in dst
+    (an earlier study) wins; src only backfills unset fields.
+    """
+    stack = [(dst, src)]
+    while stack:
+        dst_node, src_node = stack.pop()
+        for san, src_child in src_node.children.items():
+            dst_child = dst_node.children.get(san)
+            if dst_child is None:
+                dst_node.children[san] = src_child
+                continue
+            if dst_child.opening_name is None:
+                dst_child.opening_name = src_child.opening_name
+            if dst_child.study_name is None:
+                dst_child.study_name = src_child.study_name
+            if dst_child.study_id is None:
+                dst_child.study_id = src_child.study_id
+            if dst_child.chapter_id is None:
+                dst_child.chapter_id = src_child.chapter_id
+            stack.append((dst_child, src_child))
+
+
+class _LeanGameBuilder(chess.pgn.GameBuilder):
+    """
+    GameBuilder that drops comments and NAGs while parsing.
+
+    Lichess study exports are comment-heavy (annotations, clock tags,
+    %cal/%csl arrows), but the repertoire only needs headers, moves, and
+    variation structure - skipping the comment/NAG bookkeeping saves both
+    parse time and per-node string allocations.
+    """
+
+    def visit_comment(self, comment: str) -> None:
+        pass
+
+    def visit_nag(self, nag: int) -> None:
+        pass
 
 
 class RepertoireBuilder:
@@ -49,11 +200,13 @@ class RepertoireBuilder:
     _LICHESS_STUDY_SITE_RE = re.compile(
         r"https?://(?:www\.)?lichess\.org/study/([^/\s]+)(?:/([^/?#\s]+))?"
     )
+
+    # Chapter boundary in a multi-chapter study export
+    _CHAPTER_SPLIT_RE = re.compile(r"\n\n+(?=\[Event )")
     
     def __init__(self):
         self.repertoire = Repertoire()
-        self._studies: list[tuple[str, str, str, Optional[str]]] = []  # (pgn, opening_name, study_name, study_id)
-    
+
     def add_study(
         self,
         pgn: str,
@@ -61,15 +214,60 @@ class RepertoireBuilder:
         study_name: Optional[str] = None,
         study_id: Optional[str] = None,
     ):
-        """Add a study PGN to be processed."""
-        self._studies.append((pgn, opening_name, study_name or opening_name, study_id))
-    
+        """
+        Parse a study PGN into the repertoire immediately.
+
+        Studies stream through the builder one at a time - nothing buffers
+        the raw PGN text until build(), so peak memory excludes the study
+        exports themselves (easily megabytes for a large repertoire).
+        """
+        # Interning collapses the handful of name strings shared by
+        # thousands of tree nodes (and the position index) to one object each
+        opening_name = sys.intern(opening_name)
+        study_name = sys.intern(study_name) if study_name else opening_name
+        self._process_study(pgn, opening_name, study_name, study_id)
+
+    @classmethod
+    def build_parallel(
+        cls,
+        studies: list[tuple[str, str, str, Optional[str]]],
+    ) -> Repertoire:
+        """
+        Build a repertoire from several studies, parsing them in parallel.
+
+        Study parsing dominates the build and the studies are independent
+        until the merge, so larger repertoires fan the parse out across a
+        process pool and union the returned trees. Small batches stay on
+        the serial streaming path, where pool startup would cost more than
+        it saves.
+
+        Args:
+            studies: (pgn, opening_name, study_name, study_id) tuples
+
+        Returns:
+            Finalized Repertoire
+        """
+        builder = cls()
+
+        if len(studies) < _PARALLEL_MIN_STUDIES:
+            for pgn, opening_name, study_name, study_id in studies:
+                builder.add_study(pgn, opening_name, study_name, study_id)
+            return builder.build()
+
+        with ProcessPoolExecutor() as executor:
+            # map preserves study order, so merge precedence matches the
+            # serial build
+            for tree in executor.map(_parse_study_worker, studies):
+                _merge_tree(builder.repertoire.tree, tree)
+
+        return builder.build()
+
     def build(self) -> Repertoire:
-        """Process all studies and build the repertoire trees."""
-        for pgn, opening_name, study_name, study_id in self._studies:
-            self._process_study(pgn, opening_name, study_name, study_id)
+        """Finalize the repertoire built from the streamed studies."""
         # Build FEN position index for transposition handling
         self._build_fen_index()
+        # Pre-compile the flat tree so the first analysis doesn't pay for it
+        self.repertoire.get_compiled(chess.WHITE)
         return self.repertoire
     
     def _process_study(
@@ -80,45 +278,65 @@ class RepertoireBuilder:
         study_id: Optional[str],
     ):
         """Process a single study PGN (may contain multiple chapters/games)."""
-        pgn_io = io.StringIO(pgn)
-        
-        while True:
-            game = chess.pgn.read_game(pgn_io)
-            if game is None:
-                break
-            
-            # Extract chapter name from PGN headers
-            # Lichess uses the game name or title as chapter name
-            chapter_name = game.headers.get("Event") or game.headers.get("Site") or study_name
-            # Try to extract chapter id from the standard Site header.
-            # If not present, fall back to the Event header which occasionally
-            # contains study URLs in older PGN exports.
-            chapter_id = self._extract_chapter_id(game.headers.get("Site"))
-            if not chapter_id:
-                chapter_id = self._extract_chapter_id(game.headers.get("Event"))
-            
-            # Normalize study & chapter pair, avoiding redundancy.
-            # This prevents cases where a chapter that only repeats the study
-            # becomes an empty string (e.g., "Vienna: " -> "").
-            norm_study, norm_chapter = OpeningNormalizer.from_study_chapter_pair(
-                study_name, chapter_name
-            )
-
-            # Use normalized study name for consistency
-            opening_name = norm_study
-
-            # If chapter is empty after normalization, fall back to None so
-            # callers/UI can decide how to render (avoids producing "Study - ").
-            chapter_name = norm_chapter if norm_chapter else None
-
-            full_chapter_name = f"{study_name} - {chapter_name}" if chapter_name else study_name
-            self._process_game(
-                game,
-                opening_name,
-                full_chapter_name,
-                study_id,
-                chapter_id,
-            )
+        # Normalize CRLF exports (files round-tripped through Windows tools)
+        # so the chapter-boundary regex below actually matches them
+        pgn = pgn.replace("\r\n", "\n")
+
+        # Split chapters up front: handing read_game one chapter at a time
+        # beats re-scanning a single shared buffer per call, and gives the
+        # chapters as independent units of work.
+        for chapter_pgn in self._CHAPTER_SPLIT_RE.split(pgn.strip()):
+            # Read each chunk until EOF: if the splitter ever under-segments
+            # (an exotic separator it doesn't recognize), this degrades to
+            # the read-every-game behavior instead of dropping chapters
+            chapter_io = io.StringIO(chapter_pgn)
+            while True:
+                game = chess.pgn.read_game(chapter_io, Visitor=_LeanGameBuilder)
+                if game is None:
+                    break
+                self._process_chapter(game, study_name, study_id)
+
+    def _process_chapter(
+        self,
+        game: chess.pgn.Game,
+        study_name: str,
+        study_id: Optional[str],
+    ):
+        """Process a single parsed chapter/game from a study."""
+        # Extract chapter name from PGN headers
+        # Lichess uses the game name or title as chapter name
+        chapter_name = game.headers.get("Event") or game.headers.get("Site") or study_name
+        # Try to extract chapter id from the standard Site header.
+        # If not present, fall back to the Event header which occasionally
+        # contains study URLs in older PGN exports.
+        chapter_id = self._extract_chapter_id(game.headers.get("Site"))
+        if not chapter_id:
+            chapter_id = self._extract_chapter_id(game.headers.get("Event"))
+
+        # Normalize study & chapter pair, avoiding redundancy.
+        # This prevents cases where a chapter that only repeats the study
+        # becomes an empty string (e.g., "Vienna: " -> "").
+        norm_study, norm_chapter = OpeningNormalizer.from_study_chapter_pair(
+            study_name, chapter_name
+        )
+
+        # Use normalized study name for consistency
+        opening_name = sys.intern(norm_study)
+
+        # If chapter is empty after normalization, fall back to None so
+        # callers/UI can decide how to render (avoids producing "Study - ").
+        chapter_name = norm_chapter if norm_chapter else None
+
+        full_chapter_name = (
+            sys.intern(f"{study_name} - {chapter_name}") if chapter_name else study_name
+        )
+        self._process_game(
+            game,
+            opening_name,
+            full_chapter_name,
+            study_id,
+            chapter_id,
+        )
 
     def _extract_chapter_id(self, site_header: Optional[str]) -> Optional[str]:
         """Extract the chapter ID from Lichess PGN Site header URL."""
@@ -137,34 +355,42 @@ class RepertoireBuilder:
         return None
     
     def _build_fen_index(self):
-        """Build FEN position index by traversing the white repertoire tree."""
-        def traverse_tree(node: RepertoireNode, board: chess.Board):
-            """Recursively traverse tree and index FEN positions."""
-            fen = board.fen()
-            if fen and node.opening_name:
+        """
+        Build the position index by traversing the repertoire tree.
+
+        Iterative DFS with an explicit stack, replaying the chess.Move
+        cached on each node at build time - no SAN re-parsing (which runs
+        full legal-move generation) and no per-node FEN serialization.
+        Positions are keyed by python-chess's transposition key (piece
+        placement, turn, castling and en passant rights), which is both
+        cheaper to compute than a FEN string and unifies transpositions.
+        """
+        position_index = self.repertoire.position_index
+        board = chess.Board()
+
+        # Stack entries are nodes to enter; None marks a backtrack
+        stack: list[Optional[RepertoireNode]] = [self.repertoire.tree]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                board.pop()
+                continue
+
+            if node.move is not None:
+                board.push(node.move)
+                stack.append(None)
+
+            if node.opening_name:
                 # Count variations available at this position
-                variation_count = len(node.children)
-                # Store the opening and study info for this FEN
-                self.repertoire.position_index[fen] = (
+                position_index[board._transposition_key()] = (
                     node.opening_name,
                     node.study_name,
-                    variation_count,
+                    len(node.children),
                 )
-            
-            # Traverse all child positions
-            for move_san, child_node in node.children.items():
-                try:
-                    move = board.parse_san(move_san)
-                    board.push(move)
-                    traverse_tree(child_node, board)
-                    board.pop()
-                except ValueError:
-                    # Invalid move, skip
-                    pass
-        
-        # Start from white's perspective
-        board = chess.Board()
-        traverse_tree(self.repertoire.white_tree, board)
+
+            for child_node in node.children.values():
+                if child_node.move is not None:
+                    stack.append(child_node)
     
     def _process_game(
         self,
@@ -175,86 +401,87 @@ class RepertoireBuilder:
         chapter_id: Optional[str],
     ):
         """Process a single game/chapter from a study."""
-        # Process the main line and all variations
         self._process_node(
             game,
-            self.repertoire.white_tree,
-            self.repertoire.black_tree,
-            chess.WHITE,  # White moves first
+            game.board(),
+            self.repertoire.tree,
             opening_name,
             study_name,
             study_id,
             chapter_id,
         )
-    
+
     def _process_node(
         self,
         node: chess.pgn.GameNode,
-        white_tree: RepertoireNode,
-        black_tree: RepertoireNode,
-        turn: chess.Color,
+        board: chess.Board,
+        tree: RepertoireNode,
         opening_name: str,
         study_name: str,
         study_id: Optional[str],
         chapter_id: Optional[str],
     ):
-        """Recursively process a game node and its variations."""
-        # Get the current position's tree node based on perspective
-        # For White repertoire: your moves when it's White's turn
-        # For Black repertoire: your moves when it's Black's turn
-        
-        for variation in node.variations:
-            move_san = node.board().san(variation.move)
-            
-            # Add to both trees (the tree structure is the same,
-            # but interpretation differs based on which color you play)
-            
-            # White tree: positions from White's perspective
-            if move_san not in white_tree.children:
-                white_tree.children[move_san] = RepertoireNode(
-                    opening_name=opening_name,
-                    study_name=study_name,
-                    study_id=study_id,
-                    chapter_id=chapter_id,
-                    is_your_turn=(turn == chess.WHITE),
-                )
-            white_child = white_tree.children[move_san]
-            if white_child.opening_name is None:
-                white_child.opening_name = opening_name
-            if white_child.study_name is None:
-                white_child.study_name = study_name
-            if white_child.study_id is None:
-                white_child.study_id = study_id
-            if white_child.chapter_id is None:
-                white_child.chapter_id = chapter_id
-            
-            # Black tree: positions from Black's perspective
-            if move_san not in black_tree.children:
-                black_tree.children[move_san] = RepertoireNode(
-                    opening_name=opening_name,
-                    study_name=study_name,
-                    study_id=study_id,
-                    chapter_id=chapter_id,
-                    is_your_turn=(turn == chess.BLACK),
-                )
-            black_child = black_tree.children[move_san]
-            if black_child.opening_name is None:
-                black_child.opening_name = opening_name
-            if black_child.study_name is None:
-                black_child.study_name = study_name
-            if black_child.study_id is None:
-                black_child.study_id = study_id
-            if black_child.chapter_id is None:
-                black_child.chapter_id = chapter_id
-            
-            # Recursively process this variation
-            self._process_node(
-                variation,
-                white_child,
-                black_child,
-                not turn,  # Alternate turns
-                opening_name,
-                study_name,
-                study_id,
-                chapter_id,
-            )
+        """
+        Process a game node and its variations into the tree.
+
+        Iterative depth-first walk with an explicit stack: variation trees
+        in annotated chapters run deep and wide, and a Python call frame
+        per node is pure overhead (plus a RecursionError risk). One board
+        is threaded through the whole walk - GameNode.board() would replay
+        from the root per call - with chess.Move entries marking pushes
+        and None entries marking backtracks.
+
+        One tree serves both colors: whose turn a position is follows from
+        ply parity, so it is derived at query time rather than stored.
+        """
+        stack: list = [(node, tree)]
+        while stack:
+            entry = stack.pop()
+            if entry is None:
+                board.pop()
+                continue
+            if isinstance(entry, chess.Move):
+                board.push(entry)
+                continue
+
+            game_node, tree_node = entry
+
+            # The board is at game_node's position here, so SANs for its
+            # variations can be generated before descending
+            descents = []
+            for variation in game_node.variations:
+                # Intern SANs: the same handful of move strings recurs
+                # across thousands of nodes, and interned keys make dict
+                # lookups hit CPython's pointer-equality fast path
+                move_san = sys.intern(board.san(variation.move))
+
+                # One hash probe instead of the contains/insert/index triple
+                child = tree_node.children.get(move_san)
+                if child is None:
+                    child = tree_node.children[move_san] = RepertoireNode(
+                        opening_name=opening_name,
+                        study_name=study_name,
+                        study_id=study_id,
+                        chapter_id=chapter_id,
+                        move=variation.move,
+                    )
+                else:
+                    # Backfill metadata an earlier study left unset; fresh
+                    # nodes are fully populated at construction
+                    if child.opening_name is None:
+                        child.opening_name = opening_name
+                    if child.study_name is None:
+                        child.study_name = study_name
+                    if child.study_id is None:
+                        child.study_id = study_id
+                    if child.chapter_id is None:
+                        child.chapter_id = chapter_id
+
+                descents.append((variation, child))
+
+            # Schedule push / visit / backtrack per variation; reversed so
+            # the mainline is still walked first
+            for variation, child in reversed(descents):
+                stack.append(None)
+                stack.append((variation, child))
+                stack.append(variation.move)
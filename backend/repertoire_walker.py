@@ -6,15 +6,7 @@ This module encapsulates the logic for walking through a repertoire tree
 """
 import chess
 from typing import Optional, NamedTuple
-from repertoire import Repertoire, RepertoireNode
-
-
-class WalkerPosition(NamedTuple):
-    """Current position state while walking the repertoire tree."""
-    node: RepertoireNode
-    board: chess.Board
-    move_number: int
-    is_your_move: bool
+from repertoire import CompiledTree, Repertoire, RepertoireNode, child_sans, lookup_child
 
 
 class PositionInfo(NamedTuple):
@@ -48,45 +40,6 @@ class RepertoireWalker:
         """Get the repertoire tree for a specific color."""
         return self.repertoire.get_tree(color)
     
-    def walk_to_move(
-        self,
-        node: RepertoireNode,
-        move_san: str,
-        board: chess.Board,
-    ) -> Optional[WalkerPosition]:
-        """
-        Walk from current node to the next position via a move.
-        
-        Args:
-            node: Current repertoire node
-            move_san: Move in algebraic notation
-            board: Current chess board position
-        
-        Returns:
-            WalkerPosition if move is in repertoire, None if move leaves the book
-        """
-        if move_san not in node.children:
-            return None
-        
-        next_node = node.children[move_san]
-        next_board = board.copy()
-        
-        try:
-            next_board.push_san(move_san)
-        except ValueError:
-            # Invalid move
-            return None
-        
-        # Calculate if next move is user's turn (alternates each move)
-        next_is_your_turn = not node.is_your_turn
-        
-        return WalkerPosition(
-            node=next_node,
-            board=next_board,
-            move_number=(board.fullmove_number if board.turn == chess.BLACK else board.fullmove_number + 1),
-            is_your_move=next_is_your_turn,
-        )
-    
     def get_position_info(self, node: RepertoireNode) -> PositionInfo:
         """
         Get metadata about a repertoire position.
@@ -127,57 +80,95 @@ class RepertoireWalker:
         if not moves:
             return None
         
-        tree = self.get_tree_for_color(user_color)
-        board = chess.Board()
-        current_node = tree
-        
+        # Walk the compiled (flat array) tree: node ids index parallel
+        # arrays, so the per-ply step is one dict probe + one list index
+        compiled = self.repertoire.get_compiled(user_color)
+        children_arr = compiled.children
+        node_id = 0
+        children = children_arr[0]
+
         # Check if game starts with a repertoire opening
-        first_move = moves[0]
-        if first_move not in current_node.children:
+        if lookup_child(children, moves[0]) is None:
             # Game doesn't start with an opening from repertoire
             return None
-        
-        # Walk through moves one by one
+
+        # Your moves land on even plies as White, odd plies as Black
+        your_parity = 0 if user_color == chess.WHITE else 1
+
+        # Walk through moves one by one. The board is NOT updated per ply:
+        # SAN parsing (legal-move generation) is by far the most expensive
+        # step here, and the FEN is only needed at the deviation point, so
+        # it is reconstructed once from the move prefix when we return.
         for i, move_san in enumerate(moves):
-            is_white_move = (i % 2 == 0)
-            is_your_move = (is_white_move and user_color == chess.WHITE) or \
-                          (not is_white_move and user_color == chess.BLACK)
-            
-            move_number = (i // 2) + 1
-            
+            next_id = lookup_child(children, move_san)
+
             # Check if this move is in the book
-            if move_san not in current_node.children:
-                # Move leaves the book
-                position_info = self.get_position_info(current_node)
-                
+            if next_id is None:
+                # Move leaves the book; derive ply metadata only now
+                is_your_move = (i & 1) == your_parity
+                position_info = self._position_info_at(compiled, node_id)
+
+                fen = self._fen_after(moves[:i])
+                if fen is None:
+                    # An earlier book move was illegal, stop analysis
+                    return None
+
                 return DeviationInfo(
                     deviation_type="deviation" if is_your_move else "opponent_left_book",
-                    move_number=move_number,
+                    move_number=(i >> 1) + 1,
                     is_your_move=is_your_move,
                     actual_move=move_san,
                     expected_moves=position_info.available_moves,
-                    fen=board.fen(),
+                    fen=fen,
                     position_info=position_info,
                 )
-            
+
             # Move is in the book, advance to next position
-            current_node = current_node.children[move_san]
-            
-            try:
-                board.push_san(move_san)
-            except ValueError:
-                # Invalid move, stop analysis
-                return None
-        
+            node_id = next_id
+            children = children_arr[node_id]
+
         # Game followed the book for all moves
-        position_info = self.get_position_info(current_node)
-        
+        position_info = self._position_info_at(compiled, node_id)
+
+        fen = self._fen_after(moves)
+        if fen is None:
+            return None
+
         return DeviationInfo(
             deviation_type="book_completed",
             move_number=len(moves) // 2,
             is_your_move=False,
             actual_move=None,
             expected_moves=position_info.available_moves,
-            fen=board.fen(),
+            fen=fen,
             position_info=position_info,
         )
+
+    @staticmethod
+    def _position_info_at(compiled: CompiledTree, node_id: int) -> PositionInfo:
+        """Get metadata about a position in a compiled tree."""
+        available_moves = child_sans(compiled.children[node_id])
+
+        return PositionInfo(
+            opening_name=compiled.opening_names[node_id],
+            study_name=compiled.study_names[node_id],
+            study_id=compiled.study_ids[node_id],
+            chapter_id=compiled.chapter_ids[node_id],
+            available_moves=available_moves,
+            variation_count=len(available_moves),
+        )
+
+    @staticmethod
+    def _fen_after(moves: list[str]) -> Optional[str]:
+        """
+        Replay a SAN move prefix on a fresh board and return the FEN.
+
+        Returns None if any move in the prefix is illegal.
+        """
+        board = chess.Board()
+        try:
+            for move_san in moves:
+                board.push_san(move_san)
+        except ValueError:
+            return None
+        return board.fen()
@@ -2,7 +2,12 @@
 Concrete implementations of RepertoireSource and GameSource.
 """
 
+import asyncio
+import hashlib
 import logging
+import os
+import pickle
+from pathlib import Path
 from typing import Optional
 
 from pipeline import RepertoireSource, GameSource, GameFilters
@@ -14,6 +19,60 @@ from lichess import LichessClient
 logger = logging.getLogger(__name__)
 
 
+# On-disk cache of built repertoires, keyed by a content hash of the study
+# inputs. Repertoires are stable across restarts, so a process restart (or
+# expired in-memory TTL entry) deserializes instead of re-parsing every PGN.
+_REPERTOIRE_CACHE_DIR = Path(__file__).parent / "repertoire_cache"
+_REPERTOIRE_CACHE_MAX_FILES = 32
+
+
+def _repertoire_cache_key(studies: list[tuple[str, str, str, Optional[str]]]) -> str:
+    """Hash the full study inputs (PGN text included) into a cache key."""
+    # blake2b: faster than sha256 and not security-sensitive here
+    digest = hashlib.blake2b(digest_size=16)
+    for pgn, opening_name, study_name, study_id in studies:
+        for part in (pgn, opening_name, study_name, study_id or ""):
+            digest.update(part.encode())
+            digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _load_cached_repertoire(cache_key: str) -> Optional[Repertoire]:
+    """Load a cached repertoire, or None on miss or unreadable pickle."""
+    path = _REPERTOIRE_CACHE_DIR / f"{cache_key}.pkl"
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Stale format, partial write, etc. - rebuild rather than fail
+        logger.warning(f"Discarding unreadable repertoire cache {path.name}: {e}")
+        return None
+
+
+def _store_cached_repertoire(cache_key: str, repertoire: Repertoire):
+    """Persist a built repertoire; cache failures only cost the speedup."""
+    try:
+        _REPERTOIRE_CACHE_DIR.mkdir(exist_ok=True)
+        path = _REPERTOIRE_CACHE_DIR / f"{cache_key}.pkl"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            # Protocol 5 serializes the large nested structures fastest
+            pickle.dump(repertoire, f, protocol=5)
+        os.replace(tmp_path, path)
+
+        # Bound the cache: drop the oldest entries beyond the cap
+        entries = sorted(
+            _REPERTOIRE_CACHE_DIR.glob("*.pkl"),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for stale in entries[:-_REPERTOIRE_CACHE_MAX_FILES]:
+            stale.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Failed to persist repertoire cache: {e}")
+
+
 class LichessRepertoireSource(RepertoireSource):
     """Fetches and builds repertoires from Lichess studies."""
     
@@ -35,29 +94,44 @@ class LichessRepertoireSource(RepertoireSource):
         Returns:
             Repertoire object with white/black trees
         """
-        builder = RepertoireBuilder()
-        
+        # One client session for all studies; the downloads are independent
+        # round-trips, so gather them instead of paying a serial RTT each
         async with LichessClient(token=self.lichess_token) as client:
-            for study_id, study_name in zip(study_ids, study_names):
+            async def fetch_study(study_id: str, study_name: str) -> tuple[str, str]:
                 try:
                     logger.debug(f"Fetching study {study_id} ({study_name})")
                     # Deepen: LichessClient handles opening name normalization
-                    pgn, opening_name = await client.get_study_pgn_with_normalized_name(
+                    return await client.get_study_pgn_with_normalized_name(
                         study_id=study_id,
                         study_name=study_name,
                     )
-                    
-                    builder.add_study(
-                        pgn=pgn,
-                        opening_name=opening_name,
-                        study_name=study_name,
-                        study_id=study_id,
-                    )
                 except Exception as e:
                     logger.error(f"Failed to fetch study {study_id}: {e}")
                     raise
-        
-        repertoire = builder.build()
+
+            fetched = await asyncio.gather(*(
+                fetch_study(study_id, study_name)
+                for study_id, study_name in zip(study_ids, study_names)
+            ))
+
+        studies = [
+            (pgn, opening_name, study_name, study_id)
+            for (pgn, opening_name), study_id, study_name in zip(
+                fetched, study_ids, study_names
+            )
+        ]
+
+        # Content-addressed disk cache: unchanged studies deserialize
+        # instead of re-parsing every PGN
+        cache_key = _repertoire_cache_key(studies)
+        repertoire = _load_cached_repertoire(cache_key)
+        if repertoire is not None:
+            logger.debug(f"Loaded cached repertoire for {len(study_ids)} studies")
+            return repertoire
+
+        # Parsing fans out across a process pool for larger repertoires
+        repertoire = RepertoireBuilder.build_parallel(studies)
+        _store_cached_repertoire(cache_key, repertoire)
         logger.debug(f"Built repertoire from {len(study_ids)} studies")
         return repertoire
 
@@ -72,21 +146,25 @@ class CacheGameSource(GameSource):
         self,
         username: str,
         filters: GameFilters,
+        first_move_whitelist: Optional[set[str]] = None,
     ) -> list[dict]:
         """
         Fetch games from cache with applied filters.
-        
+
         Args:
             username: Chess.com username
             filters: Game filtering parameters
-        
+            first_move_whitelist: If given, skip games whose first move is
+                not in the set
+
         Returns:
             List of game dicts
         """
         logger.debug(f"Fetching games for {username} with filters: {filters}")
-        
+
         games = self.game_cache.get_cached_games(
             username=username,
+            first_move_whitelist=first_move_whitelist,
             time_classes=filters.time_classes,
             rated=filters.rated,
             color=filters.color,
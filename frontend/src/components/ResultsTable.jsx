@@ -1,5 +1,9 @@
 import { useState } from "react";
 
+// Built client-side from the FEN so the backend doesn't ship a URL per result
+const analysisUrl = (fen) =>
+  fen ? `https://lichess.org/analysis/${fen.replaceAll(" ", "_")}` : null;
+
 function ResultsTable({ results, totalGames, filteredByOpening }) {
   const [sortConfig, setSortConfig] = useState({
     key: "game_date",
@@ -197,12 +201,12 @@ function ResultsTable({ results, totalGames, filteredByOpening }) {
                 <td>
                   {(result.chapter_url ||
                     result.study_url ||
-                    result.analysis_url) && (
+                    analysisUrl(result.fen)) && (
                     <a
                       href={
                         result.chapter_url ||
                         result.study_url ||
-                        result.analysis_url
+                        analysisUrl(result.fen)
                       }
                       target="_blank"
                       rel="noopener noreferrer"